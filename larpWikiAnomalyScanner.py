@@ -1,24 +1,26 @@
 #!/usr/bin/env python3
 
-import time
 import re
-import glob
+import bisect
+import functools
+import io
+import itertools
 import os
 import platform
+import shutil
+import signal
 import sys
 import unicodedata
 import urllib.parse
-import codecs
-import queue
-from multiprocessing import Process, Event, Queue
+from concurrent.futures import ProcessPoolExecutor
 from collections import Counter
 
 baseDir = os.path.dirname(__file__)
 
 sourceDir = os.path.join(baseDir, 'backup')
-blacklist = (
+blacklist = frozenset((
     'HilfeZurCreoleSyntax.txt',
-)
+))
 
 class AnomalyFormatter:
     """
@@ -26,9 +28,30 @@ class AnomalyFormatter:
     The text buffer is returned and erased by getText().
     Also counts found anomalies.
     """
+    __slots__ = (
+        '_buffer',
+        '_escaper',
+        '_decorator',
+        'maxPartLength',
+        'qoute',
+        'ellipsis',
+        'sol',
+        'eol',
+        'minAfterLength',
+        'counts',
+        '_lastPath',
+        '_lastLineNr',
+        '_escape',
+        '_escapeLimitRight',
+        '_escapeLimitLeft',
+        '_decorate',
+        '_textYellow',
+        '_textBYellow',
+        '_textUnderline',
+    )
 
     def __init__(self, textEscaper, textDecorator, maxPartLength=70):
-        self._buffer = []
+        self._buffer = io.StringIO()
         self._escaper = textEscaper
         self._decorator = textDecorator
         self.maxPartLength = maxPartLength
@@ -40,58 +63,65 @@ class AnomalyFormatter:
         self.counts = Counter()
         self._lastPath = ''
         self._lastLineNr = 0
+        # Bound methods and codes for out(), which is called per anomaly:
+        self._escape = textEscaper.escape
+        self._escapeLimitRight = textEscaper.escapeLimitRight
+        self._escapeLimitLeft = textEscaper.escapeLimitLeft
+        self._decorate = textDecorator.decorateText
+        self._textYellow = textDecorator.textYellow
+        self._textBYellow = textDecorator.textBYellow
+        self._textUnderline = textDecorator.textUnderline
 
     def out(self, path, lineNr, startColumn, endColumn, line, anomaly):
-        b = self._buffer
-        d = self._decorator
+        w = self._buffer.write
+        decorate = self._decorate
+        textBYellow = self._textBYellow
+        counts = self.counts
         q = self.qoute
         if self._lastPath != path:
+            d = self._decorator
             self._lastPath = path
             self._lastLineNr = 0
-            self.counts['pathCount'] += 1
-            ePath = d.decorateText(self._escaper.escape(path), d.textBCyan)
+            counts['pathCount'] += 1
+            ePath = decorate(self._escape(path), d.textBCyan)
             pageName = os.path.basename(path).replace(' - ', '/')
             if pageName[-4:] == '.txt':
                 pageName = pageName[0:-4]
             url = 'https://larpwiki.de/' + urllib.parse.quote(pageName)
-            eUrl = d.decorateText(url, d.textWhite)
-            b.extend(('\n', ePath, ':\n'))
-            b.extend(('  ', eUrl, '\n'))
+            eUrl = decorate(url, d.textWhite)
+            w('\n' + ePath + ':\n  ' + eUrl + '\n')
         if self._lastLineNr != lineNr:
-            if self._lastLineNr != lineNr:
-                self.counts['lineCount'] += 1
-                self._lastLineNr = lineNr
-            eLineNr = d.decorateText(str(lineNr + 1), d.textBYellow)
-            b.extend(('  Line ', eLineNr, ':\n'))
-        self.counts['anomalyCount'] += 1
-        self.counts[anomaly] += 1
-        eColumn = d.decorateText(str(startColumn + 1), d.textBYellow)
-
+            counts['lineCount'] += 1
+            self._lastLineNr = lineNr
+            eLineNr = decorate(str(lineNr + 1), textBYellow)
+            w('  Line ' + eLineNr + ':\n')
+        counts['anomalyCount'] += 1
+        counts[anomaly] += 1
+        eColumn = decorate(str(startColumn + 1), textBYellow)
+
+        escapeLimitRight = self._escapeLimitRight
+        lineLength = len(line)
         ml = self.maxPartLength
 
         # Extract as much of the anomaly as allowed and selected:
-        t = self._escaper.escapeLimitRight(line[startColumn:endColumn], ml)
-        part = t[0]
-        partCpLength = t[1]
+        part, partCpLength = escapeLimitRight(line, startColumn, endColumn, ml)
         partComplete = ((endColumn - startColumn - partCpLength) == 0)
         ml = max(0, ml - len(part))
 
         # Extract leading text but reserve some quota for trailing:
         if partComplete:
-            mal = min(len(line) - endColumn, int(ml / 2), self.minAfterLength)
+            mal = min(lineLength - endColumn, int(ml / 2), self.minAfterLength)
         else:
             mal = 0
         bLength = min(startColumn, ml - mal)
-        t = self._escaper.escapeLimitLeft(line[:startColumn], bLength)
-        before = t[0]
-        beforeCpLength = t[1]
+        before, beforeCpLength = self._escapeLimitLeft(line, 0, startColumn
+        , bLength)
         ml = max(0, ml - len(before))
 
         # Extract as much of trailing text as available and quota left:
         if partComplete:
-            t = self._escaper.escapeLimitRight(line[endColumn:], ml)
-            after = t[0]
-            afterCpLength = t[1]
+            after, afterCpLength = escapeLimitRight(line, endColumn, lineLength
+            , ml)
         else:
             after = ''
             afterCpLength = 0
@@ -100,19 +130,20 @@ class AnomalyFormatter:
             sol = self.ellipsis
         else:
             sol = self.sol
-        if (startColumn + partCpLength + afterCpLength) < len(line):
+        if (startColumn + partCpLength + afterCpLength) < lineLength:
             eol = self.ellipsis
         else:
             eol = self.eol
-        before = d.decorateText(before, d.textYellow)
-        part = d.decorateText(part, d.textBYellow, d.textUnderline)
-        after = d.decorateText(after, d.textYellow)
-        b.extend(('    Column ', eColumn, ', anomaly ', q, anomaly, q, ':\n'))
-        b.extend(('      ', sol, q, before, part, after, q, eol, '\n'))
+        textYellow = self._textYellow
+        before = decorate(before, textYellow)
+        part = decorate(part, textBYellow, self._textUnderline)
+        after = decorate(after, textYellow)
+        w('    Column {0}, anomaly {1}{2}{1}:\n      {3}{1}{4}{5}{6}{1}{7}\n'
+        .format(eColumn, q, anomaly, sol, before, part, after, eol))
 
     def getText(self):
-        text = ''.join(self._buffer)
-        self._buffer = []
+        text = self._buffer.getvalue()
+        self._buffer = io.StringIO()
         return text
 
     def getCounts(self):
@@ -124,6 +155,8 @@ class AnsiTextDecorator:
     """
     Colorizes output for ANSI terminals
     """
+    __slots__ = ('_prefixes',)
+
     textBlack = '30'
     textRed = '31'
     textGreen = '32'
@@ -152,13 +185,21 @@ class AnsiTextDecorator:
     backgroundCyan = '46'
     backgroundGrey = '47'
 
+    def __init__(self):
+        # Escape sequences by code combination, built on first use:
+        self._prefixes = {}
+
     def decorateText(self, text, *codes):
-        if not len(codes):
+        if not codes:
             return text
-        codesStr = ''.join(('\x1B[' + code + 'm' for code in codes))
-        return '{0}{1}\x1B[0m'.format(codesStr, text)
+        prefix = self._prefixes.get(codes)
+        if prefix is None:
+            prefix = ''.join(('\x1B[' + code + 'm' for code in codes))
+            self._prefixes[codes] = prefix
+        return prefix + text + '\x1B[0m'
 
 class DummyTextDecorator(AnsiTextDecorator):
+    __slots__ = ()
 
     def decorateText(self, text, *codes):
         return text
@@ -168,32 +209,65 @@ def makeTextDecorator(useAnsi=False):
         return AnsiTextDecorator()
     return DummyTextDecorator()
 
+class _EscapeTable(dict):
+    """
+    Maps code points to their escaped text for str.translate().
+    Entries are computed on first use.
+    """
+    def __missing__(self, cp):
+        escaped = repr(chr(cp))[1:-1].replace('"', r'\"')
+        self[cp] = escaped
+        return escaped
+
+_escapeTable = _EscapeTable()
+
+def _isVerbatim(text):
+    """
+    Tells whether escaping leaves text unchanged, which holds for printable
+    code points other than '"' and '\\'.
+    """
+    return text.isprintable() and '"' not in text and '\\' not in text
+
 class TextEscaper:
     """
     Escapes non-printable code points except space (0x20).
+    Every code point is escaped on its own, so the escaped length of a text
+    is the sum of its code points' escaped lengths.
     """
+    __slots__ = ()
+
     def escape(self, text):
-        return repr(text)[1:-1].replace('"', r'\"')
+        return text.translate(_escapeTable)
 
-    def escapeLimitRight(self, text, maxLength):
+    def escapeLimitRight(self, text, start, end, maxLength):
+        """
+        Escapes as much of text[start:end] from the left as fits maxLength.
+        Returns the escaped text and the count of code points escaped.
+        """
         if maxLength <= 0:
             return '', 0
-        text = text[:maxLength]
-        textEsc = self.escape(text)
-        while len(textEsc) > maxLength:
-            text = text[0:-1]
-            textEsc = self.escape(text)
-        return textEsc, len(text)
-  
-    def escapeLimitLeft(self, text, maxLength):
+        text = text[start:min(end, start + maxLength)]
+        if _isVerbatim(text):
+            return text, len(text)
+        lengths = list(itertools.accumulate(
+            len(_escapeTable[ord(cp)]) for cp in text))
+        cpLength = bisect.bisect_right(lengths, maxLength)
+        return self.escape(text[:cpLength]), cpLength
+
+    def escapeLimitLeft(self, text, start, end, maxLength):
+        """
+        Escapes as much of text[start:end] from the right as fits maxLength.
+        Returns the escaped text and the count of code points escaped.
+        """
         if maxLength <= 0:
             return '', 0
-        text = text[-maxLength:]
-        textEsc = self.escape(text)
-        while len(textEsc) > maxLength:
-            text = text[1:]
-            textEsc = self.escape(text)
-        return textEsc, len(text)
+        text = text[max(start, end - maxLength):end]
+        if _isVerbatim(text):
+            return text, len(text)
+        lengths = list(itertools.accumulate(
+            len(_escapeTable[ord(cp)]) for cp in reversed(text)))
+        cpLength = bisect.bisect_right(lengths, maxLength)
+        return self.escape(text[len(text) - cpLength:]), cpLength
 
 _detectSmilieRe = re.compile(r'''(?:^|(?<=\s))
 [:;,8B][-~]?(?:[)}\]|({[]{1,2}|[pPD])[=\#]?
@@ -208,53 +282,101 @@ def detectSmilie(line, offset):
     The smilie has to begin and end at the start/end of line or after/before
     whitespace.
     """
+    # Rule out most candidates before entering the regex engine:
+    if len(line) < offset + 2 or line[offset] not in ':;,8B':
+        return False
+    if offset and not line[offset - 1].isspace():
+        return False
     return _detectSmilieRe.match(line, offset) is not None
 
-def checkForInvalidCodePoints(escaper, outputter, path, lineNr, line):
-    markAllowed = False
-    for cpIndex, cp in enumerate(line):
-        anomaly = True
-        unexpectedMark = False
-        cpCat = unicodedata.category(cp)
-        cpCatMain = cpCat[0]
-
-        # Don't report letters, numbers, punctuation, symbols,
-        # whitespace and some miscategorized whitespace:
-        if cpCatMain in 'LNPSZ' or cp in (
-            '\t',
-            '\xad', # SOFT HYPHEN, category Cf
-            '\u200d', # ZERO WIDTH JOINER, category Cf
-            '\u200e', # LEFT-TO-RIGHT MARK, category Cf
-            None
-        ):
-            anomaly = False
-
-        # But report REPLACEMENT CHARACTER from category So, because
-        # it most likely is a character set conversion artifact:
-        if cp == '�':
-            anomaly = True
-
-        # Don't report marks following letters or other marks:
-        if cpCatMain == 'M':
-            if markAllowed:
-                anomaly = False
-            else:
-                # Not in letter cluster.
-                anomaly, unexpectedMark = True, True
-        elif cpCatMain == 'L':
-            markAllowed = True
+# Memoized code point properties. A wiki uses a few hundred distinct code
+# points at most, so the caches stay small without an LRU bound:
+_codePointCategory = functools.lru_cache(maxsize=None)(unicodedata.category)
+
+@functools.lru_cache(maxsize=None)
+def _codePointName(cp):
+    return unicodedata.name(cp, 'unnamed')
+
+def reportCodePoint(escaper, outputter, path, lineNr, line, cpIndex, cpCat
+, suffix=''):
+    cp = line[cpIndex]
+    cpName = _codePointName(cp)
+    msg = 'Unicode {0} ({1}, category {2}){3}'
+    msg = msg.format(escaper.escape(cp), cpName, cpCat, suffix)
+    outputter.out(path, lineNr, cpIndex, cpIndex + 1, line, msg)
+
+# Main categories and code points not reported by checkForInvalidCodePoints():
+_validCategories = frozenset('LNPSZ')
+_validCodePoints = frozenset((
+    '\t',
+    '\xad', # SOFT HYPHEN, category Cf
+    '\u200d', # ZERO WIDTH JOINER, category Cf
+    '\u200e', # LEFT-TO-RIGHT MARK, category Cf
+))
+
+class _CodePointClassTable(dict):
+    """
+    Maps code points to their class for str.translate():
+    'L' for letters, 'M' for marks, 'V' for other valid code points and
+    'I' for invalid code points. Entries are computed on first use.
+    """
+    def __missing__(self, cp):
+        c = chr(cp)
+        cpCatMain = _codePointCategory(c)[0]
+        # Report REPLACEMENT CHARACTER from category So, because it most
+        # likely is a character set conversion artifact:
+        if c == '�':
+            cpClass = 'I'
+        elif cpCatMain == 'L' or cpCatMain == 'M':
+            cpClass = cpCatMain
+        # Don't report numbers, punctuation, symbols, whitespace and some
+        # miscategorized whitespace:
+        elif cpCatMain in _validCategories or c in _validCodePoints:
+            cpClass = 'V'
         else:
-            markAllowed = False
+            cpClass = 'I'
+        self[cp] = cpClass
+        return cpClass
 
-        if anomaly:
-            cpName = unicodedata.name(cp, 'unnamed')
-            if unexpectedMark:
-                suffix = ' not preceded by a letter'
-            else:
-                suffix = ''
-            msg = 'Unicode {0} ({1}, category {2}){3}'
-            msg = msg.format(escaper.escape(cp), cpName, cpCat, suffix)
-            outputter.out(path, lineNr, cpIndex, cpIndex + 1, line, msg)
+_codePointClassTable = _CodePointClassTable()
+
+# Invalid code points and runs of marks not following a letter, matched
+# against the classes of a line's code points:
+_invalidCodePointClassesRe = re.compile(r'I|(?<![LM])M+')
+
+# ASCII code points reported by checkForInvalidCodePoints():
+_asciiInvalidCodePointsRe = re.compile('[{0}]'.format(re.escape(''.join(
+    chr(i) for i in range(128)
+    if unicodedata.category(chr(i))[0] not in _validCategories
+    and chr(i) not in _validCodePoints))))
+def checkForInvalidCodePoints(escaper, outputter, path, lineNr, line):
+    # Fast path for the common case of ASCII lines, which can't contain
+    # marks or replacement characters:
+    if line.isascii():
+        matches = _asciiInvalidCodePointsRe.finditer(line)
+        for match in matches:
+            cpIndex = match.start()
+            cpCat = _codePointCategory(match.group())
+            reportCodePoint(escaper, outputter, path, lineNr, line, cpIndex
+            , cpCat)
+        return
+
+    # Classify all code points in one C-level pass and find the invalid
+    # ones by regex, instead of looping over code points in Python:
+    cpClasses = line.translate(_codePointClassTable)
+    matches = _invalidCodePointClassesRe.finditer(cpClasses)
+    for match in matches:
+        start = match.start()
+        if cpClasses[start] == 'I':
+            cpCat = _codePointCategory(line[start])
+            reportCodePoint(escaper, outputter, path, lineNr, line, start
+            , cpCat)
+            continue
+        # Marks not in a letter cluster:
+        for cpIndex in range(start, match.end()):
+            cpCat = _codePointCategory(line[cpIndex])
+            reportCodePoint(escaper, outputter, path, lineNr, line, cpIndex
+            , cpCat, ' not preceded by a letter')
 
 _checkForUseModListRe = re.compile(r'(\*|#(\*|#([*#])))[*#]*')
 def checkForUseModList(outputter, path, lineNr, line, isDirective, isComment):
@@ -296,59 +418,77 @@ def detectRedirect(outputter, path, lineNr, line, firstDirectiveLine
     return validRedirectPresent, False
 
 def detectUseModIndent(outputter, path, lineNr, line):
-    if line[0:1] != ':' or detectSmilie(line, 0):
+    if not line or line[0] != ':' or detectSmilie(line, 0):
         return False
     end = len(line) - len(line.lstrip(':'))
     outputter.out(path, lineNr, 0, end, line, 'UseMod indentation')
     return True
 
 def detectUseModDefinitionList(outputter, path, lineNr, line):
-    if line[0:1] != ';' or detectSmilie(line, 0):
+    if not line or line[0] != ';' or detectSmilie(line, 0):
         return False
     outputter.out(path, lineNr, 0, 1, line, 'UseMod definition list')
     return True
 
-_detectUseModTagsRe = re.compile(r'''<(?P<close>[/]?)
-(?P<name>(b|i|nowiki|pre|toc|tt))
->''', re.IGNORECASE | re.VERBOSE)
-def detectUseModTags(outputter, path, lineNr, line):
-    matches = _detectUseModTagsRe.finditer(line)
-    for match in matches:
-        start = match.start()
-        end = match.end()
-        closing = match.group('close')
-        tagName = match.group('name').lower()
-        tagType = 'close' if closing else 'open'
-        msg = 'UseMod tag {0} {1}'.format(tagName, tagType)
-        outputter.out(path, lineNr, start, end, line, msg)
-    return False
+_useModParagraphChecks = {
+    ':': detectUseModIndent,
+    ';': detectUseModDefinitionList,
+}
+def checkUseModParagraph(outputter, path, lineNr, line):
+    """
+    Dispatches to the UseMod paragraph modifier check for the first
+    character of the line, so other lines cost one dict lookup.
+    """
+    check = _useModParagraphChecks.get(line[:1])
+    if check is None:
+        return False
+    return check(outputter, path, lineNr, line)
 
-_checkBrTagsRe = re.compile(r'''
-(?P<open><[<`]*)
-(?P<name>br)
-(?P<close>[>`]*>)
+_checkTagsRe = re.compile(r'''
+(?P<useModTag><(?P<close>[/]?)
+(?P<name>(b|i|nowiki|pre|toc|tt))
+>)
+|(?P<brTag>(?P<brOpen><[<`]*)
+(?P<brName>br)
+(?P<brClose>[>`]*>))
 ''', re.IGNORECASE | re.VERBOSE)
-def checkBrTags(outputter, path, lineNr, line):
+def checkTags(outputter, path, lineNr, line):
     """
+    Checks all tags in one pass over the line.
+
+    UseMod tags: <b>, <i>, <nowiki>, <pre>, <toc>, <tt>
     UseMod forced linebreak: <br>
     MoinMoin forced linebreak: <<BR>>
+    Only the first bad forced linebreak of a line is reported.
     """
-    matches = _checkBrTagsRe.finditer(line)
+    if '<' not in line:
+        return False
+    brReported = False
+    matches = _checkTagsRe.finditer(line)
     for match in matches:
         start = match.start()
         end = match.end()
-        tagOpen = match.group('open')
-        tagName = match.group('name')
-        tagClose = match.group('close')
+        if match.lastgroup == 'useModTag':
+            closing = match.group('close')
+            tagName = match.group('name').lower()
+            tagType = 'close' if closing else 'open'
+            msg = 'UseMod tag {0} {1}'.format(tagName, tagType)
+            outputter.out(path, lineNr, start, end, line, msg)
+            continue
+        if brReported:
+            continue
+        tagOpen = match.group('brOpen')
+        tagName = match.group('brName')
+        tagClose = match.group('brClose')
         if (tagOpen == '<') and (tagClose == '>'):
             msg = 'UseMod forced linebreak'
             outputter.out(path, lineNr, start, end, line, msg)
-            return True
-        if ((tagOpen == '<<') and (tagClose[0:2] == '>>')
+            brReported = True
+        elif ((tagOpen == '<<') and (tagClose[0:2] == '>>')
         and (tagName != 'BR')):
             msg = 'Invalid MoinMoin forced linebreak'
             outputter.out(path, lineNr, start, end, line, msg)
-            return True
+            brReported = True
     return False
 
 _checkHeadlinesRe = re.compile(r'''
@@ -361,7 +501,10 @@ _checkHeadlinesRe = re.compile(r'''
 (?P<closeTag>[=]*) # Has to be same as open tag.
 (?P<spaceAfterClose>\s*) # Illegal trailing whitespace.
 $''', re.VERBOSE)
+_headlineMarkupRe = re.compile(r"[`']{2,}")
 def checkHeadlines(outputter, path, lineNr, line):
+    if '=' not in line:
+        return False
     match = _checkHeadlinesRe.match(line)
     if match is None:
         return False
@@ -385,10 +528,12 @@ def checkHeadlines(outputter, path, lineNr, line):
         msg = 'Headline of level > 5'
         outputter.out(path, lineNr, start, end, line, msg)
     if text:
-        iMatches = re.finditer(r"[`']{2,}", text)
+        # Search the line itself to get line columns without offsets:
+        iMatches = _headlineMarkupRe.finditer(line, match.start('text')
+        , match.end('text'))
         for iMatch in iMatches:
-            start = match.start('text') + iMatch.start()
-            end = match.start('text') + iMatch.end()
+            start = iMatch.start()
+            end = iMatch.end()
             msg = 'Headline contains markup'
             outputter.out(path, lineNr, start, end, line, msg)
     else:
@@ -433,6 +578,8 @@ def checkHeadlines(outputter, path, lineNr, line):
 
 _detectUseModAnchorsRe = re.compile(r'(?:^|[^[])(\[#[^#\]]+\])(?:$|[^]])')
 def detectUseModAnchors(outputter, path, lineNr, line):
+    if '[#' not in line:
+        return False
     matches = _detectUseModAnchorsRe.finditer(line)
     for match in matches:
         start = match.start(1)
@@ -451,7 +598,10 @@ _checkLinksRe = re.compile(r'''
 (?P<closeBrackets>[\]`]*\]) # Valid links got 2 brackets
 ''', re.IGNORECASE | re.VERBOSE)
 def checkLinks(outputter, path, lineNr, line):
-    matches = _checkLinksRe.finditer(line)
+    # Every link ends with ']'. Not scanning past the last one keeps the
+    # non-greedy URL group from backtracking through the rest of the line
+    # for each unclosed '[', which took cubic time:
+    matches = _checkLinksRe.finditer(line, 0, line.rfind(']') + 1)
     for match in matches:
         start = match.start()
         end = match.end()
@@ -462,7 +612,7 @@ def checkLinks(outputter, path, lineNr, line):
             msg = 'Fail-converted unnamed internal UseMod link'
             outputter.out(path, lineNr, start, end, line, msg)
             continue
-        if (len(openBrackets) == 1) and re.search(r':', linkUrl):
+        if (len(openBrackets) == 1) and (':' in linkUrl):
             msg = 'Fail-converted external UseMod link'
             outputter.out(path, lineNr, start, end, line, msg)
             continue
@@ -470,6 +620,8 @@ def checkLinks(outputter, path, lineNr, line):
 
 _detectUseModUploadsRe = re.compile(r'(^|\s)(?P<link>upload:\S+)(\s|$)', re.I)
 def detectUseModUploads(outputter, path, lineNr, line):
+    if 'upload:' not in line.lower():
+        return False
     matches = _detectUseModUploadsRe.finditer(line)
     for match in matches:
         start = match.start('link')
@@ -478,57 +630,52 @@ def detectUseModUploads(outputter, path, lineNr, line):
         outputter.out(path, lineNr, start, end, line, msg)
     return False
 
-# noinspection PyUnusedLocal
-def detectMoinMoinComment(outputter, path, lineNr, line):
-    return line.startswith('##')
-
 def makeCheckFile(checkFuns, cols, useAnsi):
     escaper = TextEscaper()
     decorator = makeTextDecorator(useAnsi)
     maxPartLength = cols - 11
     outputter = AnomalyFormatter(escaper, decorator, maxPartLength)
+    checkFuns = tuple(checkFuns)
 
     def checkFile(path):
 
         # Read file and report broken UTF-8 encoding:
         with open(path, 'rb') as file:
             textBytes = file.read()
-        decoder = codecs.getincrementaldecoder('utf-8')()
-        lines, line, invalidEncoding = [], [], False
-        lastI = len(textBytes) + 1
-        for i in range(0, len(textBytes)):
-            try:
-                cp = decoder.decode(textBytes[i:i+1], i == lastI)
-                if len(cp) != 0:
-                    if cp == '\n':
-                        if line[-1:] == ['\r']:
-                            del line[-1]
-                        lines.append(''.join(line))
-                        line = []
-                    else:
-                        line.append(cp)
-            except ValueError:
-                invalidEncoding = True
-                lineNr, cpIndex = len(lines) + 1, len(line)
-                lineStr = ''.join(line)
-                msg = 'UTF-8 invalid byte while decoding line!'
-                outputter.out(path, lineNr, cpIndex, cpIndex + 1, lineStr, msg)
-                break
-        if invalidEncoding:
+        try:
+            text = textBytes.decode('utf-8')
+        except UnicodeDecodeError as e:
+            lineStart = textBytes.rfind(b'\n', 0, e.start) + 1
+            lineEnd = textBytes.find(b'\n', e.start)
+            if lineEnd == -1:
+                lineEnd = len(textBytes)
+            elif lineEnd > lineStart and textBytes[lineEnd - 1] == 0x0d:
+                # Drop the CR of a CRLF line end like the normal path does:
+                lineEnd -= 1
+            lineNr = textBytes.count(b'\n', 0, lineStart)
+            cpIndex = len(textBytes[lineStart:e.start].decode('utf-8'))
+            lineStr = textBytes[lineStart:lineEnd].decode('utf-8', 'replace')
+            msg = 'UTF-8 invalid byte while decoding line!'
+            outputter.out(path, lineNr, cpIndex, cpIndex + 1, lineStr, msg)
             return outputter.getText(), tuple(outputter.getCounts().items())
-        lines.append(''.join(line))
+        lines = text.replace('\r\n', '\n').split('\n')
 
         firstDirectiveLine = 1
         validRedirectPresent = False
         for lineNr, line in enumerate(lines):
-            isComment = detectMoinMoinComment(outputter, path, lineNr, line)
-            isDirective = not isComment and line.startswith('#')
+            # MoinMoin comments start with '##', directives with '#'. Only
+            # such lines and lines starting with '*' can be UseMod lists:
+            first = line[:1]
+            isDirective = first == '#'
+            isComment = isDirective and line[1:2] == '#'
+            isDirective = isDirective and not isComment
 
             checkForInvalidCodePoints(escaper, outputter, path, lineNr
             , line)
 
-            isDirective, isComment = checkForUseModList(outputter, path
-            , lineNr, line, isDirective, isComment)
+            if first == '#' or first == '*':
+                isDirective, isComment = checkForUseModList(outputter, path
+                , lineNr, line, isDirective, isComment)
 
             # No further wiki syntax checks for comments:
             if isComment:
@@ -545,64 +692,60 @@ def makeCheckFile(checkFuns, cols, useAnsi):
                 if skipRemaining:
                     continue
 
-            validRedirectPresent, skipRemaining = detectRedirect(outputter, path
-            , lineNr, line, firstDirectiveLine, validRedirectPresent)
-            if skipRemaining:
-                continue
-
             if isDirective:
+                validRedirectPresent, _ = detectRedirect(outputter, path
+                , lineNr, line, firstDirectiveLine, validRedirectPresent)
                 # Skip other directives.
                 continue
 
+            # All syntax checks run; their results don't skip any others:
             for checkFun in checkFuns:
-                skipRemaining = checkFun(outputter, path, lineNr, line)
-                if skipRemaining:
-                    continue
+                checkFun(outputter, path, lineNr, line)
 
         return outputter.getText(), tuple(outputter.getCounts().items())
 
     return checkFile
 
-def workerProc(termE:Event, jobs:Queue, results:Queue, workerFactory, *args):
-    try:
-        workFun = workerFactory(*args)
-        while not termE.is_set():
-            try:
-                job = jobs.get(True, 0.02)
-            except queue.Empty:
-                continue
-            result = job, workFun(job)
-            results.put(result, True)
-    except KeyboardInterrupt:
-        pass
+_workerCheckFile = None
+_workerEncoding = None
 
-def handleResults(results:Queue, counts:Counter):
-    while True:
-        try:
-            job, (rText, rCounts) = results.get(False)
-        except queue.Empty:
-            return
-        counts['fileCount'] += 1
-        if len(rText) != 0:
-            print(rText, end='')
-        for name, count in rCounts:
-            counts[name] += count
+def initWorker(checkFuns, cols, useAnsi, encoding):
+    """
+    Prepares a worker process for checkPath().
+    Interrupts are handled by the main process only.
+    """
+    global _workerCheckFile, _workerEncoding
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _workerCheckFile = makeCheckFile(checkFuns, cols, useAnsi)
+    _workerEncoding = encoding
+
+def checkPath(path):
+    """
+    Checks a file and returns its report already encoded for output,
+    so the main process only has to copy bytes.
+    """
+    rText, rCounts = _workerCheckFile(path)
+    return rText.encode(*_workerEncoding), rCounts
+
+def handleResult(result, counts:Counter, output):
+    rText, rCounts = result
+    counts['fileCount'] += 1
+    if len(rText) != 0:
+        output.write(rText)
+    for name, count in rCounts:
+        counts[name] += count
 
 def main():
     checkFuns = (
-        detectUseModIndent,
-        detectUseModDefinitionList,
-        detectUseModTags,
-        checkBrTags,
+        checkUseModParagraph,
+        checkTags,
         checkHeadlines,
         checkLinks,
         detectUseModAnchors,
         detectUseModUploads,
     )
     if sys.stdout.isatty() and (platform.system() != 'Windows'):
-        import subprocess
-        cols = int(subprocess.Popen(('tput', 'cols'),
-            stdout=subprocess.PIPE).stdout.read())
+        cols = shutil.get_terminal_size().columns
         if cols <= 0:
             cols = 80
         useAnsi = True
@@ -610,45 +753,42 @@ def main():
         cols, useAnsi = 80, False
 
     workerCount = max(1, len(os.sched_getaffinity(0)))
-    termE = Event()
-    jobs = Queue(maxsize=2*workerCount)
-    results = Queue(maxsize=2*workerCount)
-    workerArgs = termE, jobs, results, makeCheckFile, checkFuns, cols, useAnsi
-    workerPool = [Process(target=workerProc, args=workerArgs)
-        for _ in range(0, workerCount)]
-    for worker in workerPool:
-        worker.start()
+    # Reports are written to the binary buffer beneath sys.stdout:
+    encoding = sys.stdout.encoding, sys.stdout.errors
+    workerArgs = checkFuns, cols, useAnsi, encoding
     counts = Counter()
     blistedCount = 0
-    try:
-        print('Scanning files...')
-        paths = glob.iglob(os.path.join(sourceDir, "*.txt"))
-        for path in paths:
-            if not os.path.isfile(path):
-                continue
-            if path in blacklist:
-                blistedCount += 1
-                continue
-            while True:
-                handleResults(results, counts)
-                try:
-                    jobs.put(path, True, 0.02)
-                    break
-                except queue.Full:
-                    pass
-        while not jobs.empty():
-            handleResults(results, counts)
-            time.sleep(0.02)
-    except KeyboardInterrupt:
-        print('')
-        print('Processing interrupted by user!')
-    termE.set()
-    while any(worker.is_alive() for worker in workerPool):
-        handleResults(results, counts)
-        time.sleep(0.02)
-    for worker in workerPool:
-        worker.join()
-    handleResults(results, counts)
+    with ProcessPoolExecutor(workerCount, initializer=initWorker
+    , initargs=workerArgs) as executor:
+        try:
+            print('Scanning files...', flush=True)
+            paths = []
+            try:
+                with os.scandir(sourceDir) as entries:
+                    for entry in entries:
+                        name = entry.name
+                        if (name.startswith('.') or not name.endswith('.txt')
+                        or not entry.is_file()):
+                            continue
+                        if name in blacklist:
+                            blistedCount += 1
+                            continue
+                        paths.append(entry.path)
+            except (FileNotFoundError, NotADirectoryError):
+                # Scan nothing, like glob did for a missing directory:
+                print('Source directory not found: ' + sourceDir
+                , file=sys.stderr)
+            # Hand out files in chunks to save IPC round trips, but keep
+            # enough chunks to balance the load between workers:
+            chunkSize = max(1, min(16, len(paths) // (4 * workerCount)))
+            results = executor.map(checkPath, paths, chunksize=chunkSize)
+            for result in results:
+                handleResult(result, counts, sys.stdout.buffer)
+        except KeyboardInterrupt:
+            print('')
+            print('Processing interrupted by user!')
+            executor.shutdown(cancel_futures=True)
+    sys.stdout.buffer.flush()
 
     decorator = makeTextDecorator(useAnsi)
     fileCount, anomalyCount = counts['fileCount'], counts['anomalyCount']